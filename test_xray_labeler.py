@@ -0,0 +1,113 @@
+import os
+
+import numpy as np
+import pytest
+
+import xray_labeler
+from xray_labeler import XRayLabeler
+
+
+def _box(labeler, filename):
+    return tuple(labeler._ann[labeler._ann_idx[filename]])[1:]
+
+
+def test_save_round_trips_comma_in_filename(tmp_path):
+    output = tmp_path / 'annotations.csv'
+
+    labeler = XRayLabeler(tmp_path, output)
+    labeler._set_annotation('Smith, John.dcm', 10.125, 20.5, 30.0625, 40.0)
+    labeler.save_annotations()
+    # Newly labeled file only: appended to the existing CSV
+    labeler._set_annotation('plain.dcm', 1.1, 2.2, 3.3, 4.4)
+    labeler.save_annotations()
+
+    reloaded = XRayLabeler(tmp_path, output)
+    assert set(reloaded._ann_idx) == {'Smith, John.dcm', 'plain.dcm'}
+    assert _box(reloaded, 'Smith, John.dcm') == (10.125, 20.5, 30.0625, 40.0)
+    assert _box(reloaded, 'plain.dcm') == (1.1, 2.2, 3.3, 4.4)
+
+    # Editing a saved box rewrites the file; untouched rows keep full precision
+    reloaded._set_annotation('Smith, John.dcm', 0.1, 0.2, 0.3, 0.4)
+    reloaded.save_annotations()
+
+    again = XRayLabeler(tmp_path, output)
+    assert _box(again, 'Smith, John.dcm') == (0.1, 0.2, 0.3, 0.4)
+    assert _box(again, 'plain.dcm') == (1.1, 2.2, 3.3, 4.4)
+
+
+def test_append_after_missing_final_newline(tmp_path):
+    output = tmp_path / 'annotations.csv'
+    output.write_bytes(b'filename,x,y,width,height\nb.DCM,1,2,3,4')
+
+    labeler = XRayLabeler(tmp_path, output)
+    labeler._set_annotation('a.dcm', 1.0, 2.0, 3.0, 4.0)
+    labeler.save_annotations()
+
+    reloaded = XRayLabeler(tmp_path, output)
+    assert _box(reloaded, 'b.DCM') == (1.0, 2.0, 3.0, 4.0)
+    assert _box(reloaded, 'a.dcm') == (1.0, 2.0, 3.0, 4.0)
+
+
+@pytest.fixture(params=['numba', 'no-numba'])
+def labeler(request, tmp_path, monkeypatch):
+    if request.param == 'numba':
+        if xray_labeler._rescale_u16_to_u8 is None:
+            pytest.skip('numba not installed')
+    else:
+        monkeypatch.setattr(xray_labeler, '_rescale_u16_to_u8', None)
+    return XRayLabeler(tmp_path, tmp_path / 'annotations.csv')
+
+
+@pytest.mark.parametrize('dtype', [np.uint8, np.uint16, np.int16, np.uint32, np.float32])
+def test_to_display_u8_stretches_min_max(labeler, dtype):
+    image = np.array([[10, 20], [40, 60]], dtype)
+
+    out = labeler._to_display_u8(image)
+    assert out.dtype == np.uint8
+    assert out.shape == image.shape
+    assert out.min() == 0 and out.max() == 255
+    assert out[0, 0] == 0 and out[1, 1] == 255
+    assert 0 < out[0, 1] < out[1, 0] < 255
+
+
+@pytest.mark.parametrize('dtype', [np.uint8, np.uint16, np.int16, np.uint32, np.float32])
+def test_to_display_u8_constant_frame_is_black(labeler, dtype):
+    image = np.full((3, 4), 7, dtype)
+
+    out = labeler._to_display_u8(image, out=np.full((3, 4), 99, np.uint8))
+    assert out.dtype == np.uint8
+    assert not out.any()
+
+
+@pytest.mark.parametrize('dtype', [np.uint16, np.int16, np.uint32])
+def test_integer_paths_round_to_nearest(labeler, dtype):
+    out = labeler._to_display_u8(np.array([0, 1, 2, 3, 1000], dtype))
+    # 255 / 1000 per step: 0.255, 0.51, 0.765 round to 0, 1, 1
+    assert out.tolist() == [0, 0, 1, 1, 255]
+
+
+def test_to_display_u8_full_range_uint8_is_not_copied(labeler):
+    image = np.array([[0, 128], [64, 255]], np.uint8)
+    assert labeler._to_display_u8(image) is image
+
+
+def test_walk_files_matches_extensions(tmp_path):
+    (tmp_path / 'sub').mkdir()
+    for name in ['a.dcm', 'b.DCM', 'sub/c.Dcm', 'd.jpeg', 'e.JPG', 'f.png',
+                 'dcm', '.dcm', 'notes.txt', 'g.dcm.bak']:
+        (tmp_path / name).write_bytes(b'')
+    os.symlink(tmp_path / 'a.dcm', tmp_path / 'link.dcm')
+    # Symlinked directories are not followed
+    os.symlink(tmp_path / 'sub', tmp_path / 'loop')
+
+    dcm, img = XRayLabeler(tmp_path, tmp_path / 'annotations.csv')._walk_files()
+    assert sorted(p.relative_to(tmp_path).as_posix() for p in dcm) == \
+        ['a.dcm', 'b.DCM', 'link.dcm', 'sub/c.Dcm']
+    assert sorted(p.name for p in img) == ['d.jpeg', 'e.JPG', 'f.png']
+
+
+def test_extension():
+    assert xray_labeler._extension('scan.DCM') == 'dcm'
+    assert xray_labeler._extension('photo.tar.JPEG') == 'jpeg'
+    assert xray_labeler._extension('dcm') == ''
+    assert xray_labeler._extension('.dcm') == ''
@@ -2,6 +2,9 @@ import os
 import sys
 import argparse
 import csv
+import threading
+import collections
+from concurrent.futures import ThreadPoolExecutor
 import pydicom
 from pathlib import Path
 import numpy as np
@@ -10,15 +13,110 @@ import matplotlib.pyplot as plt
 from matplotlib.widgets import RectangleSelector
 from matplotlib.patches import Rectangle
 
+# Prefer pylibjpeg over GDCM/Pillow for compressed transfer syntaxes when it
+# is installed. pydicom 2.x tries GDCM and Pillow before pylibjpeg, so the
+# handler list is reordered; pydicom 3 ignores that list and the plugin is
+# tried first per dataset instead (see _read_pixels)
+try:
+    import pylibjpeg  # noqa: F401
+    _HAVE_PYLIBJPEG = True
+except ImportError:
+    _HAVE_PYLIBJPEG = False
+
+_PYDICOM_V3 = hasattr(pydicom.Dataset, 'pixel_array_options')
+
+if _HAVE_PYLIBJPEG and _PYDICOM_V3:
+    from pydicom.pixels import get_decoder
+elif _HAVE_PYLIBJPEG:
+    from pydicom.pixel_data_handlers import pylibjpeg_handler
+    pydicom.config.pixel_data_handlers.remove(pylibjpeg_handler)
+    pydicom.config.pixel_data_handlers.insert(0, pylibjpeg_handler)
+
+def _pylibjpeg_supports(ds):
+    """True if the pydicom 3 pylibjpeg plugin can decode the transfer syntax of ds"""
+    try:
+        decoder = get_decoder(ds.file_meta.TransferSyntaxUID)
+    except (AttributeError, NotImplementedError):
+        return False
+    return 'pylibjpeg' in decoder.available_plugins
+
+# Optional: numba compiles the 16-bit display rescale to a SIMD, multi-threaded
+# kernel. Without it the lookup-table path is used.
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None
+
+if njit is not None:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _rescale_u16_to_u8(src, mn, inv, out):
+        """Stretch flat uint16 src into flat uint8 out; inv is 255 / (max - min), computed by the caller"""
+        for i in prange(src.size):
+            # +0.5 rounds to nearest like the convertScaleAbs and NumPy paths
+            out[i] = np.uint8(min((src[i] - mn) * inv + 0.5, 255.0))
+else:
+    _rescale_u16_to_u8 = None
+
+# numba's default threading layer aborts on concurrent parallel launches, and
+# frames are decoded from several prefetch threads
+_rescale_lock = threading.Lock()
+
+# Integer dtypes stretched with cv2.convertScaleAbs (uint16 has its own path)
+_CV2_INT_DTYPES = (np.uint8, np.int8, np.int16, np.int32)
+
+DICOM_EXTENSIONS = {'dcm'}
+IMAGE_EXTENSIONS = {'jpg', 'jpeg', 'png'}
+
+def _extension(name):
+    """Lower-case extension of a file name without the dot ('' if there is none)"""
+    return os.path.splitext(name)[1][1:].lower()
+
+def _is_dicom(path):
+    return _extension(path.name) in DICOM_EXTENSIONS
+
+# One record per annotated file, box in original image pixel coordinates.
+# Names are kept as objects so long paths are never truncated; coordinates
+# are float64 so rows round-trip through the CSV unchanged.
+_BBOX_DTYPE = np.dtype([('name', object), ('x', 'f8'), ('y', 'f8'), ('w', 'f8'), ('h', 'f8')])
+
 class XRayLabeler:
-    def __init__(self, input_dir, output_file):
+    # Number of normalized display frames kept in memory
+    FRAME_CACHE_SIZE = 32
+    # Number of images decoded ahead of the current one
+    PREFETCH_AHEAD = 2
+    # Longest side of the cached review-mode thumbnails
+    THUMB_SIZE = 512
+    # Frames are cached at this multiple of the axes' pixel size so toolbar
+    # zoom keeps some detail before the image runs out of resolution
+    DISPLAY_OVERSAMPLE = 2
+
+    def __init__(self, input_dir, output_file, review=False):
         self.input_dir = Path(input_dir)
         self.output_file = Path(output_file)
+        # Review mode shows DICOMs from low-resolution PNG thumbnails cached
+        # next to the output file instead of decoding full pixel data
+        self.review = review
+        self._thumb_dir = self.output_file.parent / f'.{self.output_file.stem}_thumbs'
         self.dicom_files = []
+        # Interned file names, parallel to dicom_files
+        self._names = []
         self.current_index = 0
-        self.annotations = {}
         self.current_rect = None
-        self.existing_annotations = {}
+        # Annotations: first _n_ann records of _ann are valid, _ann_idx maps
+        # filename -> record index. Records below _n_saved are in the CSV.
+        self._ann = np.empty(0, dtype=_BBOX_DTYPE)
+        self._ann_idx = {}
+        self._n_ann = 0
+        self._n_saved = 0
+        self._lut = (None, None)
+        self._frame_cache = collections.OrderedDict()
+        self._cache_lock = threading.Lock()
+        # Per-thread scratch buffer for full-size uint8 frames that are
+        # downsampled before caching
+        self._disp_buf = threading.local()
+        self._pool = ThreadPoolExecutor(max_workers=2)
+        self._futures = {}
+        self._dirty = set()
         self.load_existing_annotations()
         
     def load_existing_annotations(self):
@@ -29,21 +127,32 @@ class XRayLabeler:
                 headers = next(reader)
                 for row in reader:
                     if len(row) >= 5:
-                        filename = row[0]
-                        self.existing_annotations[filename] = {
-                            'x': float(row[1]),
-                            'y': float(row[2]),
-                            'width': float(row[3]),
-                            'height': float(row[4])
-                        }
+                        self._set_annotation(row[0], *map(float, row[1:5]))
+        self._n_saved = self._n_ann
+        self._dirty.clear()
+
+    def _set_annotation(self, filename, x, y, width, height):
+        """Update the record for filename, appending one if it is new"""
+        filename = sys.intern(filename)
+        index = self._ann_idx.get(filename)
+        if index is None:
+            if self._n_ann == len(self._ann):
+                # Grow in power-of-two steps
+                self._ann = np.resize(self._ann, max(16, 2 * len(self._ann)))
+            index = self._n_ann
+            self._n_ann += 1
+            self._ann_idx[filename] = index
+        self._ann[index] = (filename, x, y, width, height)
+        self._dirty.add(index)
     
     def scan_directory(self):
-        """Scan directory for DICOM, JPG, and PNG files"""
-        self.dicom_files = list(self.input_dir.glob('**/*.dcm'))
+        """Scan directory for DICOM, JPG, and PNG files (by extension, files are not opened)"""
+        dcm, img = self._walk_files()
+        self.dicom_files = sorted(dcm)
     
     # If no DICOM files found, try looking for JPG or PNG files
         if not self.dicom_files:
-            self.dicom_files = list(self.input_dir.glob('**/*.jpg')) + list(self.input_dir.glob('**/*.png'))
+            self.dicom_files = sorted(img)
         
             if not self.dicom_files:
                 print(f"No DICOM, JPG, or PNG files found in {self.input_dir}")
@@ -52,18 +161,62 @@ class XRayLabeler:
             print(f"Found {len(self.dicom_files)} JPG or PNG files")
         else:
             print(f"Found {len(self.dicom_files)} DICOM files")
+            
+        self._names = [sys.intern(p.name) for p in self.dicom_files]
+
+    def _walk_files(self):
+        """Collect DICOM and regular image paths in a single directory traversal"""
+        dcm, img = [], []
+        stack = [self.input_dir]
+        while stack:
+            try:
+                entries = os.scandir(stack.pop())
+            except OSError:
+                continue
+            with entries:
+                for entry in entries:
+                    # Symlinked directories are not followed (no loops), but
+                    # symlinked files are listed, as glob('**/*.dcm') did
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file():
+                        ext = _extension(entry.name)
+                        if ext in DICOM_EXTENSIONS:
+                            dcm.append(Path(entry.path))
+                        elif ext in IMAGE_EXTENSIONS:
+                            img.append(Path(entry.path))
+        return dcm, img
 
     def start_labeling(self):
         """Start the labeling process"""
         self.scan_directory()
         self.setup_display()
         plt.show()
+        self._pool.shutdown(wait=False, cancel_futures=True)
         
     def setup_display(self):
         """Setup the matplotlib display"""
         self.fig, self.ax = plt.subplots(figsize=(10, 10))
         self.fig.subplots_adjust(left=0.1, right=0.9, top=0.9, bottom=0.1)
         
+        # A single image artist is reused for every frame via set_data
+        self._im = self.ax.imshow(np.zeros((2, 2), np.uint8), cmap='gray', vmin=0, vmax=255)
+        # Axes size in device pixels, read by the prefetch workers
+        self._axes_px = self._axes_size()
+        # Reloads the current frame after a resize; a draw can't be started
+        # from inside the draw_event handler that notices the new size
+        self._reload_timer = self.fig.canvas.new_timer(interval=0)
+        self._reload_timer.single_shot = True
+        self._reload_timer.add_callback(self._reload_current)
+        
+        # Annotation patches are blitted on top of a cached background; connect
+        # before the selector so the background is captured without its artists
+        self._bg = None
+        # Set by anything that needs a full repaint; flushed once per event
+        # handler by _flush_redraw()
+        self._needs_redraw = False
+        self.fig.canvas.mpl_connect('draw_event', self._on_draw)
+        
         # Add navigation buttons
         self.ax_prev = plt.axes([0.1, 0.01, 0.1, 0.05])
         self.prev_button = plt.Button(self.ax_prev, 'Previous')
@@ -88,6 +241,7 @@ class XRayLabeler:
         )
         
         self.load_current_image()
+        self._flush_redraw()
         
     def on_select(self, eclick, erelease):
         """Callback for rectangle selection"""
@@ -99,112 +253,338 @@ class XRayLabeler:
         width = abs(x2 - x1)
         height = abs(y2 - y1)
         
-        current_file = str(self.dicom_files[self.current_index].name)
-        self.annotations[current_file] = {
-            'x': x,
-            'y': y,
-            'width': width,
-            'height': height
-        }
+        current_file = self._names[self.current_index]
+        self._set_annotation(current_file, x, y, width, height)
         
         # Update display
         self.draw_annotations()
+        self._flush_redraw()
         
     def load_current_image(self):
         """Load and display the current image"""
         if not self.dicom_files:
             return
             
-        self.ax.clear()
+        # Drop the previous image's box before the full draw below, so it is
+        # neither painted nor makes the selector re-render its background
+        for artist in list(self.ax.texts) + list(self.ax.patches):
+            artist.remove()
+        self.selector.set_visible(False)
         current_file = self.dicom_files[self.current_index]
+        self.ax.set_title(f"File: {self._names[self.current_index]} ({self.current_index + 1}/{len(self.dicom_files)})")
         
         try:
-            # Try to read as DICOM first
-            try:
-                ds = pydicom.dcmread(current_file)
-                image = ds.pixel_array
-            except:
-                # If fails, try to read as regular image
-                image = cv2.imread(str(current_file), cv2.IMREAD_GRAYSCALE)
-                if image is None:
-                    raise Exception("Could not read image file")
-            
-            # Normalize image for display
-            if image.max() > 0:
-                image = (image / image.max() * 255).astype(np.uint8)
-                
-            self.ax.imshow(image, cmap='gray')
-            self.ax.set_title(f"File: {current_file.name} ({self.current_index + 1}/{len(self.dicom_files)})")
+            # Reuse a prefetch that is already running or finished
+            future = self._futures.pop(self.current_index, None)
+            if future is not None and not future.cancel():
+                image, (h, w) = future.result()
+            else:
+                image, (h, w) = self._get_display_array(current_file)
+            # Extent is in original pixel coordinates so selections stay valid
+            # when the displayed array has been downsampled
+            self._im.set_data(image)
+            self._im.set_extent((-0.5, w - 0.5, h - 0.5, -0.5))
+            # Reset any zoom/pan from the previous image
+            self.ax.set_xlim(-0.5, w - 0.5)
+            self.ax.set_ylim(h - 0.5, -0.5)
+            self._im.set_visible(True)
+            self.selector.set_active(True)
             
-            # Load existing annotation if available
-            if current_file.name in self.existing_annotations:
-                self.annotations[current_file.name] = self.existing_annotations[current_file.name]
-                
+            # Full draw of the new image; _on_draw captures the blit background.
+            # Without blitting the handler's single draw_idle covers everything.
+            self._bg = None
+            if self.fig.canvas.supports_blit:
+                self.fig.canvas.draw()
             self.draw_annotations()
-            self.fig.canvas.draw_idle()
+            self._prefetch()
             
         except Exception as e:
             print(f"Error reading file {current_file}: {e}")
+            self._im.set_visible(False)
+            # Nothing valid to label: drop the previous image's coordinate
+            # system and ignore selections until a readable image is shown
+            self.ax.set_xlim(0, 1)
+            self.ax.set_ylim(1, 0)
+            self.selector.set_active(False)
             self.ax.text(0.5, 0.5, f"Error reading file: {e}", 
                          ha="center", va="center", transform=self.ax.transAxes)
-            self.fig.canvas.draw_idle()
+            self._needs_redraw = True
             
+    def _get_display_array(self, path):
+        """Return (display array, original (h, w)) for path, using the frame cache"""
+        with self._cache_lock:
+            if path in self._frame_cache:
+                self._frame_cache.move_to_end(path)
+                return self._frame_cache[path]
+
+        if self.review and _is_dicom(path):
+            entry = self._get_thumbnail(path)
+        else:
+            axes_px = self._axes_px
+            image = self._read_pixels(path)
+            h, w = image.shape[:2]
+            scale = self.DISPLAY_OVERSAMPLE * min(axes_px[0] / w, axes_px[1] / h)
+            entry = (self._downsample_u8(image, scale), (h, w))
+            if axes_px != self._axes_px:
+                # Window resized while decoding; don't cache a frame sized for the old axes
+                return entry
+
+        with self._cache_lock:
+            self._frame_cache[path] = entry
+            self._frame_cache.move_to_end(path)
+            while len(self._frame_cache) > self.FRAME_CACHE_SIZE:
+                self._frame_cache.popitem(last=False)
+        return entry
+
+    def _get_thumbnail(self, path):
+        """Return (thumbnail, original (h, w)) for a DICOM, creating the PNG thumbnail on first use"""
+        ds = pydicom.dcmread(path, stop_before_pixels=True)
+        shape = (int(ds.Rows), int(ds.Columns))
+
+        thumb_path = self._thumb_dir / path.relative_to(self.input_dir).with_suffix('.png')
+        if thumb_path.exists() and thumb_path.stat().st_mtime >= path.stat().st_mtime:
+            thumb = cv2.imread(str(thumb_path), cv2.IMREAD_GRAYSCALE)
+            if thumb is not None:
+                return thumb, shape
+
+        image = self._read_pixels(path)
+        thumb = self._downsample_u8(image, self.THUMB_SIZE / max(image.shape[:2]))
+        thumb_path.parent.mkdir(parents=True, exist_ok=True)
+        # Fastest zlib level: thumbnails are small and written once
+        cv2.imwrite(str(thumb_path), thumb, [cv2.IMWRITE_PNG_COMPRESSION, 1])
+        return thumb, image.shape[:2]
+
+    def _downsample_u8(self, image, scale):
+        """Convert image to uint8 and shrink it by scale (images are never enlarged)"""
+        if scale >= 1:
+            return self._to_display_u8(image)
+        # The full-size uint8 frame is only an intermediate here, so it goes
+        # into a reused buffer; only the downsampled copy is kept
+        disp = self._to_display_u8(image, out=self._display_buffer(image.shape))
+        return cv2.resize(disp, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+
+    def _display_buffer(self, shape):
+        """Return this thread's uint8 scratch buffer, reallocated only when the shape changes"""
+        buf = getattr(self._disp_buf, 'buf', None)
+        if buf is None or buf.shape != shape:
+            buf = self._disp_buf.buf = np.empty(shape, np.uint8)
+        return buf
+
+    def _read_pixels(self, path):
+        """Read the raw pixel array of an image file"""
+        # The reader is chosen from the extension, as in scan_directory, so a
+        # file is never parsed twice. Read errors (e.g. InvalidDicomError)
+        # propagate and are reported by load_current_image.
+        if _is_dicom(path):
+            # Large elements (pixel data included) are only read from disk when accessed
+            ds = pydicom.dcmread(path, defer_size='16 KB')
+            if _HAVE_PYLIBJPEG and _PYDICOM_V3 and _pylibjpeg_supports(ds):
+                try:
+                    ds.pixel_array_options(decoding_plugin='pylibjpeg')
+                    return ds.pixel_array
+                except RuntimeError:
+                    # Fall back to pydicom's own plugin order
+                    ds.pixel_array_options(decoding_plugin='')
+            return ds.pixel_array
+
+        # Read at native depth (16-bit PNGs stay 16-bit) and convert color
+        # images with a single cvtColor pass. Unlike IMREAD_UNCHANGED these
+        # flags still apply EXIF orientation, as IMREAD_GRAYSCALE did, so
+        # saved boxes keep lining up with rotated JPGs.
+        image = cv2.imread(str(path), cv2.IMREAD_ANYDEPTH | cv2.IMREAD_ANYCOLOR)
+        if image is None:
+            raise Exception("Could not read image file")
+        if image.ndim == 3:
+            image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        return image
+
+    def _to_display_u8(self, image, out=None):
+        """Convert image to uint8 for display using the cheapest path for its dtype, writing into out when given"""
+        # Every path stretches [min, max] to [0, 255]. This also makes the
+        # DICOM RescaleSlope/Intercept irrelevant for display: the stretch
+        # cancels any positive linear rescale.
+        if image.dtype.kind == 'f':
+            if out is None:
+                out = np.empty(image.shape, np.uint8)
+            cv2.normalize(image, out, 0, 255, cv2.NORM_MINMAX, cv2.CV_8U)
+            return out
+
+        mn, mx = float(image.min()), float(image.max())
+        # 8-bit data that already spans the full range is displayable as is
+        if image.dtype == np.uint8 and mn == 0 and mx == 255:
+            return image
+        if out is None:
+            out = np.empty(image.shape, np.uint8)
+
+        if mx <= mn:
+            out.fill(0)
+        elif image.dtype == np.uint16:
+            # 12-16 bit DICOM: numba kernel if available, else one table lookup per pixel
+            if _rescale_u16_to_u8 is not None:
+                with _rescale_lock:
+                    _rescale_u16_to_u8(image.ravel(), mn, 255.0 / (mx - mn), out.reshape(-1))
+            else:
+                self._get_lut(mn, mx).take(image, out=out, mode='clip')
+        elif image.dtype in _CV2_INT_DTYPES:
+            # 8-bit and signed data: one fused scale+shift+cast pass
+            alpha = 255.0 / (mx - mn)
+            cv2.convertScaleAbs(image, dst=out, alpha=alpha, beta=-mn * alpha)
+        else:
+            # OpenCV rejects uint32/int64/uint64 (pydicom returns uint32 for
+            # unsigned 32-bit DICOM), so stretch those in NumPy
+            scaled = (image - mn) * (255.0 / (mx - mn))
+            np.rint(scaled, out=scaled)
+            np.copyto(out, scaled, casting='unsafe')
+        return out
+
+    def _prefetch(self):
+        """Decode the next few images in the background so navigation is instant"""
+        wanted = range(self.current_index + 1,
+                       min(self.current_index + 1 + self.PREFETCH_AHEAD, len(self.dicom_files)))
+
+        # Cancel prefetches that are no longer ahead of us (e.g. after going back)
+        for index in list(self._futures):
+            if index not in wanted:
+                self._futures.pop(index).cancel()
+
+        for index in wanted:
+            if index in self._futures:
+                continue
+            path = self.dicom_files[index]
+            with self._cache_lock:
+                if path in self._frame_cache:
+                    continue
+            # Errors stay in the future and are reported when the image is shown
+            self._futures[index] = self._pool.submit(self._get_display_array, path)
+
+    def _get_lut(self, mn, mx):
+        """Return a uint16 -> uint8 display LUT for [mn, mx], reusing the last one if possible"""
+        key, lut = self._lut
+        if key != (mn, mx):
+            lut = np.clip((np.arange(65536) - mn) * (255.0 / (mx - mn)) + 0.5, 0, 255).astype(np.uint8)
+            self._lut = ((mn, mx), lut)
+        return lut
+
+    def _axes_size(self):
+        """Pixel size of the space the axes may fill, before the image aspect shrinks it"""
+        box = self.ax.get_position(original=True).transformed(self.fig.transFigure)
+        return (box.width, box.height)
+
+    def _on_draw(self, event):
+        """Cache the axes background after a full draw and paint the animated annotations on it"""
+        self._bg = self.fig.canvas.copy_from_bbox(self.ax.bbox)
+        axes_px = self._axes_size()
+        if axes_px != self._axes_px:
+            # Window resized: cached and prefetched frames were sized for the
+            # old axes, so drop them and rebuild the current one
+            self._axes_px = axes_px
+            for future in self._futures.values():
+                future.cancel()
+            self._futures.clear()
+            with self._cache_lock:
+                self._frame_cache.clear()
+            self._reload_timer.start()
+        for patch in self.ax.patches:
+            self.ax.draw_artist(patch)
+
+    def _reload_current(self):
+        """Redisplay the current image at the current axes size"""
+        self.load_current_image()
+        self._flush_redraw()
+
     def draw_annotations(self):
         """Draw existing annotations on the image"""
-        for patch in self.ax.patches:
+        for patch in list(self.ax.patches):
             patch.remove()
             
-        current_file = str(self.dicom_files[self.current_index].name)
-        if current_file in self.annotations:
-            ann = self.annotations[current_file]
+        rect = None
+        current_file = self._names[self.current_index]
+        if current_file in self._ann_idx:
+            ann = self._ann[self._ann_idx[current_file]]
             rect = Rectangle(
                 (ann['x'], ann['y']), 
-                ann['width'], ann['height'],
-                linewidth=2, edgecolor='r', facecolor='none'
+                ann['w'], ann['h'],
+                linewidth=2, edgecolor='r', facecolor='none',
+                animated=True
             )
             self.ax.add_patch(rect)
-            self.fig.canvas.draw_idle()
             
+        canvas = self.fig.canvas
+        if self._bg is None or not canvas.supports_blit:
+            self._needs_redraw = True
+            return
+        # Only repaint the rectangle over the cached image
+        canvas.restore_region(self._bg)
+        if rect is not None:
+            self.ax.draw_artist(rect)
+        canvas.blit(self.ax.bbox)
+            
+    def _flush_redraw(self):
+        """Schedule one full repaint if anything during this event asked for it"""
+        if self._needs_redraw:
+            self._needs_redraw = False
+            self.fig.canvas.draw_idle()
+
     def next_image(self, event=None):
         """Navigate to next image"""
         if self.current_index < len(self.dicom_files) - 1:
             self.current_index += 1
             self.load_current_image()
+            self._flush_redraw()
             
     def previous_image(self, event=None):
         """Navigate to previous image"""
         if self.current_index > 0:
             self.current_index -= 1
             self.load_current_image()
+            self._flush_redraw()
             
+    @staticmethod
+    def _last_byte(path):
+        """Last byte of path, or b'' if it is missing or empty"""
+        try:
+            with open(path, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                return f.read(1)
+        except OSError:
+            return b''
+
     def save_annotations(self, event=None):
         """Save annotations to CSV file"""
-        with open(self.output_file, 'w', newline='') as f:
-            writer = csv.writer(f)
-            writer.writerow(['filename', 'x', 'y', 'width', 'height'])
-            
-            # Combine existing annotations with new ones
-            combined_annotations = {**self.existing_annotations, **self.annotations}
-            
-            for filename, ann in combined_annotations.items():
-                writer.writerow([
-                    filename,
-                    ann['x'],
-                    ann['y'],
-                    ann['width'],
-                    ann['height']
-                ])
-                
+        last_byte = self._last_byte(self.output_file)
+        if last_byte and all(i >= self._n_saved for i in self._dirty):
+            # Only new files were labeled: append their records
+            with open(self.output_file, 'a', newline='') as f:
+                if last_byte not in b'\r\n':
+                    # Hand-edited files may lack the final line break
+                    f.write('\r\n')
+                csv.writer(f).writerows(self._ann[self._n_saved:self._n_ann].tolist())
+                f.flush()
+                os.fsync(f.fileno())
+        else:
+            # A saved annotation changed (or no file yet): rewrite everything
+            with open(self.output_file, 'w', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(['filename', 'x', 'y', 'width', 'height'])
+                writer.writerows(self._ann[:self._n_ann].tolist())
+                f.flush()
+                os.fsync(f.fileno())
+
+        # Everything in memory is now on disk
+        self._n_saved = self._n_ann
+        self._dirty.clear()
         print(f"Annotations saved to {self.output_file}")
         
 def main():
     parser = argparse.ArgumentParser(description='Label regions in X-ray DICOM images')
     parser.add_argument('--input', '-i', required=True, help='Input directory containing DICOM files')
     parser.add_argument('--output', '-o', required=True, help='Output CSV file for annotations')
+    parser.add_argument('--review', action='store_true',
+                        help='Review mode: show DICOM files from cached low-resolution thumbnails')
     
     args = parser.parse_args()
     
-    labeler = XRayLabeler(args.input, args.output)
+    labeler = XRayLabeler(args.input, args.output, review=args.review)
     labeler.start_labeling()
     
 if __name__ == '__main__':